@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+"""Cycle time, bus bytes, allocations and peak RSS of the BMS versus number of (emulated) boards.
+
+Usage (from the python directory): python3 -m benchmarks.boards [--boards 1 5 10 25 50] [--output results.json]
+Compare two results: python3 -m benchmarks.boards --compare old.json new.json [--threshold 0.1]
+"""
+
+from classes.BMS import BMS
+from classes.isoSPIEmulator import isoSPIEmulator
+from multiprocessing import Process, Queue
+from time import perf_counter
+import argparse
+import json
+import pickle
+import platform
+import resource
+import sys
+import tracemalloc
+
+STAGES = ['measure_ambient_temp', 'temp_mon', 'measure_voltages', 'balancing', 'telemetry']
+
+def timed(bms, stage, method, results):
+	"""Wraps a method of the BMS so that its duration and bus bytes are added to results[stage]."""
+	def wrapper(*args, **kwargs):
+		bus_bytes = bms.isoSPI.bus_bytes
+		start = perf_counter()
+		ret = method(*args, **kwargs)
+		results[stage]['s'] += perf_counter() - start
+		results[stage]['bus_bytes'] += bms.isoSPI.bus_bytes - bus_bytes
+		return ret
+	return wrapper
+
+def telemetry(bms):
+	"""Returns the serialized status (as sent by a worker process to the Supervisor)."""
+	return pickle.dumps(bms.status())
+
+def cycle(bms, send=telemetry):
+	"""One pass of the theBMS main loop (inverter control and telemetry without database)."""
+	bms.monitor()
+	bms.balance()
+	bms.control_inverter()
+	return send(bms)
+
+def measure(boards, cycles, warmup, latency, allocation_cycles=3):
+	"""Returns the results for one number of boards (in a dict)."""
+	bms = BMS(boards, transport=isoSPIEmulator(boards, latency=latency))
+	for i in range(warmup): # Balancing active and every stage run once
+		cycle(bms)
+
+	stages = {stage: {'s': 0.0, 'bus_bytes': 0} for stage in STAGES}
+	for stage in ['measure_ambient_temp', 'temp_mon', 'measure_voltages']:
+		setattr(bms, stage, timed(bms, stage, getattr(bms, stage), stages))
+	bms.renew_balancing = timed(bms, 'balancing', bms.renew_balancing, stages)
+	bms.balance = timed(bms, 'balancing', bms.balance, stages)
+	timed_telemetry = timed(bms, 'telemetry', telemetry, stages)
+
+	# Cycle time
+	bus_bytes = bms.isoSPI.bus_bytes
+	start = perf_counter()
+	for i in range(cycles):
+		cycle(bms, timed_telemetry)
+	cycle_s = (perf_counter() - start) / cycles
+	bus_bytes = (bms.isoSPI.bus_bytes - bus_bytes) / cycles
+	stage_results = {}
+	for stage, result in stages.items():
+		stage_results[stage] = {'s': result['s'] / cycles, 'bus_bytes': result['bus_bytes'] / cycles}
+
+	peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # Without the overhead of tracemalloc
+
+	# Allocations (separate passes, tracing slows down the cycle)
+	tracemalloc.start()
+	snapshot = tracemalloc.take_snapshot()
+	tracemalloc.reset_peak()
+	for i in range(allocation_cycles):
+		cycle(bms)
+	current, peak = tracemalloc.get_traced_memory()
+	retained = 0
+	for stat in tracemalloc.take_snapshot().compare_to(snapshot, 'filename'):
+		retained += max(stat.count_diff, 0)
+	tracemalloc.stop()
+
+	return {
+		'boards': boards,
+		'cycles': cycles,
+		'warmup': warmup,
+		'allocation_cycles': allocation_cycles,
+		'cycle_s': cycle_s,
+		'bus_bytes_per_cycle': bus_bytes,
+		'stages': stage_results,
+		'traced_peak_bytes': peak,
+		'retained_blocks': retained,
+		'peak_rss_kib': peak_rss,
+	}
+
+def run(boards, cycles, warmup, latency, allocation_cycles, results):
+	results.put(measure(boards, cycles, warmup, latency, allocation_cycles))
+
+def compare(old, new, threshold):
+	"""Prints the relative change of every metric and returns the number of regressions."""
+	regressions = 0
+	old_results = {r['boards']: r for r in old['results']}
+	for r in new['results']:
+		o = old_results.get(r['boards'])
+		if o is None:
+			continue
+		metrics = [('cycle_s', o['cycle_s'], r['cycle_s'])]
+		metrics += [(stage + '.s', o['stages'][stage]['s'], r['stages'][stage]['s']) for stage in STAGES]
+		metrics += [(key, o[key], r[key]) for key in ['bus_bytes_per_cycle', 'traced_peak_bytes', 'peak_rss_kib']]
+		for name, before, after in metrics:
+			change = (after - before) / before if before else 0.0
+			flag = ''
+			if change > threshold:
+				flag = ' REGRESSION'
+				regressions += 1
+			print("boards {:2d} {:32s} {:12.6g} -> {:12.6g} ({:+.1%}){}".format(r['boards'], name, before, after, change, flag))
+	return regressions
+
+def main():
+	parser = argparse.ArgumentParser(description="BMS scalability versus number of boards")
+	parser.add_argument('--boards', type=int, nargs='+', default=[1, 5, 10, 25, 50])
+	parser.add_argument('--cycles', type=int, default=9, help="measured passes")
+	parser.add_argument('--warmup', type=int, default=3, help="passes before measuring")
+	parser.add_argument('--allocation-cycles', type=int, default=3, help="passes traced by tracemalloc")
+	parser.add_argument('--latency', type=float, default=0.0, help="seconds per emulated transaction")
+	parser.add_argument('--output', help="JSON file (default: stdout)")
+	parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two JSON files")
+	parser.add_argument('--threshold', type=float, default=0.1, help="relative change considered a regression")
+	args = parser.parse_args()
+
+	if args.compare:
+		with open(args.compare[0]) as f:
+			old = json.load(f)
+		with open(args.compare[1]) as f:
+			new = json.load(f)
+		sys.exit(1 if compare(old, new, args.threshold) else 0)
+
+	results = []
+	for boards in args.boards:
+		# Fresh process for every number of boards (peak RSS)
+		queue = Queue()
+		p = Process(target=run, args=[boards, args.cycles, args.warmup, args.latency, args.allocation_cycles, queue])
+		p.start()
+		results.append(queue.get())
+		p.join()
+
+	document = {
+		'python': platform.python_version(),
+		'machine': platform.machine(),
+		'latency': args.latency,
+		'results': results,
+	}
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(document, f, indent=1)
+	else:
+		print(json.dumps(document, indent=1))
+
+if __name__ == "__main__":
+	main()
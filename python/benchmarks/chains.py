@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+"""Cycle rate versus number of (emulated) isoSPI chains run by the Supervisor.
+
+Usage (from the python directory): python3 -m benchmarks.chains [--chains 1 2 4 8] [--duration 10]
+Prints one JSON object per number of chains.
+"""
+
+from classes.Supervisor import Supervisor
+from time import time
+import argparse
+import json
+import os
+
+def measure(chains, boards, duration, latency, warmup=60):
+	"""Returns the number of monitoring passes of all chains within duration seconds."""
+	supervisor = Supervisor([{'boards': boards, 'emulated': True, 'latency': latency}] * chains)
+	try:
+		supervisor.check_chains()
+		pending = set(range(chains))
+		deadline = time() + warmup
+		while pending: # Warm-up: every chain has completed one pass
+			if time() > deadline:
+				raise RuntimeError("chains {} did not complete a pass within {} s".format(sorted(pending), warmup))
+			for chain, timestamp, status in supervisor.step():
+				pending.discard(chain)
+
+		cycles = [0] * chains
+		end = time() + duration
+		while time() < end:
+			for chain, timestamp, status in supervisor.step(wait=0.1):
+				cycles[chain] += 1
+	finally:
+		supervisor.shutdown()
+	return cycles
+
+def main():
+	parser = argparse.ArgumentParser(description="Cycle rate versus number of chains")
+	parser.add_argument('--chains', type=int, nargs='+', default=[1, 2, 4, 8])
+	parser.add_argument('--boards', type=int, default=1)
+	parser.add_argument('--duration', type=float, default=10)
+	parser.add_argument('--latency', type=float, default=0.0, help="seconds per emulated transaction")
+	parser.add_argument('--warmup', type=float, default=60, help="maximum seconds until every chain has completed a pass")
+	args = parser.parse_args()
+
+	for chains in args.chains:
+		cycles = measure(chains, args.boards, args.duration, args.latency, args.warmup)
+		print(json.dumps({
+			'chains': chains,
+			'boards': args.boards,
+			'cpus': os.cpu_count(),
+			'latency': args.latency,
+			'duration': args.duration,
+			'cycles_per_s': sum(cycles) / args.duration,
+			'cycles_per_s_per_chain': [c / args.duration for c in cycles],
+		}))
+
+if __name__ == "__main__":
+	main()
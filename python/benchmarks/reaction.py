@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+"""Reaction time of the safety fast path (BMS.trip) to emulated OV, UV, OH and ambient temperature faults.
+
+Usage (from the python directory): python3 -m benchmarks.reaction [--trials 20] [--latency 0.001]
+Faults are injected at random points of the cycle. The reaction is measured in transactions (calls of
+the C++ program) and seconds from the injection until the balancing is paused and the battery inverter
+is stopped. The Supervisor path (one emulated chain in a worker process, pack inverter in the Supervisor)
+is measured in seconds, its bound adds --delivery seconds for the trip message to the bound of the process.
+Prints one JSON object per fault and path and exits with 1 if a reaction exceeds its bound.
+"""
+
+from benchmarks.boards import cycle
+from classes.BMS import BMS
+from classes.Supervisor import Supervisor, run_chain
+from classes.isoSPIEmulator import isoSPIEmulator
+from multiprocessing import Queue
+from threading import Event, Thread
+from time import perf_counter, sleep, time
+import argparse
+import json
+import random
+import sys
+
+# Worst case in cycles from the injection until the fault is decoded:
+# every quantity is measured every pass, but may have been measured just before the injection
+BOUND_CYCLES = {'ov': 2, 'uv': 2, 'oh': 2, 'ambient': 2}
+
+def inject(emulator, fault, cell, set_):
+	"""Sets (or clears) a fault of the primary board."""
+	if fault == 'ov':
+		emulator.voltages[0][cell] = 4.3 if set_ else 3.7
+	elif fault == 'uv':
+		emulator.voltages[0][cell] = 2.5 if set_ else 3.7
+	elif fault == 'oh':
+		if set_:
+			emulator.overheated[0].add(cell)
+		else:
+			emulator.overheated[0].discard(cell)
+	elif fault == 'ambient':
+		emulator.ambient_temp[0] = 60.0 if set_ else 25.0
+
+def wait_until(condition, timeout):
+	"""Waits until condition() is True and returns False on a timeout."""
+	end = perf_counter() + timeout
+	while not condition():
+		if perf_counter() > end:
+			return False
+		sleep(0.0005)
+	return True
+
+def measure(boards, fault, trials, latency):
+	"""Returns the reactions to one fault (in a dict)."""
+	emulator = isoSPIEmulator(boards, latency=latency)
+	bms = BMS(boards, transport=emulator)
+
+	trips = []
+	trip = bms.trip
+	def recorded_trip():
+		trip()
+		trips.append((perf_counter(), emulator.transactions))
+	bms.trip = recorded_trip
+
+	done = Event()
+	passes = [0]
+	def loop():
+		while not done.is_set():
+			cycle(bms)
+			passes[0] += 1
+	Thread(target=loop, daemon=True).start()
+
+	# Fault-free cycle (mean of three passes, balancing active)
+	running = lambda: bms.balancing and bms.running and all(emulator.balancing)
+	wait_until(running, 60)
+	count = passes[0]
+	wait_until(lambda: passes[0] > count, 60) # Start of a pass
+	transactions = emulator.transactions
+	start = perf_counter()
+	wait_until(lambda: passes[0] > count + 3, 60)
+	cycle_transactions = (emulator.transactions - transactions) / 3
+	cycle_s = (perf_counter() - start) / 3
+
+	reactions = []
+	for i in range(trials):
+		wait_until(running, 60)
+		sleep(random.uniform(0, cycle_s)) # Random point of the cycle
+		del trips[:]
+		cell = random.randrange(BMS._BLOCKS_PER_BOARD)
+		injected = (perf_counter(), emulator.transactions)
+		inject(emulator, fault, cell, True)
+		wait_until(lambda: len(trips) > 0, 60)
+		if not trips:
+			reactions.append(None)
+		else:
+			safe = not any(emulator.balancing) and not bms.sunny_boy.get_state()
+			reactions.append({
+				's': trips[0][0] - injected[0],
+				'transactions': trips[0][1] - injected[1],
+				'safe': safe,
+			})
+		inject(emulator, fault, cell, False)
+	done.set()
+
+	measured = [r for r in reactions if r is not None]
+	bound = BOUND_CYCLES[fault] * cycle_transactions
+	passed = len(measured) == trials and all(r['safe'] and r['transactions'] <= bound for r in measured)
+	return {
+		'path': 'process',
+		'fault': fault,
+		'boards': boards,
+		'latency': latency,
+		'trials': trials,
+		'cycle_transactions': cycle_transactions,
+		'cycle_s': cycle_s,
+		'bound_transactions': bound,
+		'max_transactions': max([r['transactions'] for r in measured], default=None),
+		'max_s': max([r['s'] for r in measured], default=None),
+		'mean_s': sum(r['s'] for r in measured) / len(measured) if measured else None,
+		'passed': passed,
+	}
+
+def run_faulty_chain(chain, config, telemetry, profiler=None):
+	"""Runs an emulated chain (see run_chain), injects a fault into the cell of a command and clears it on the next."""
+	emulator = isoSPIEmulator(config['boards'], latency=config['latency'])
+	def injector():
+		while True:
+			cell = config['commands'].get()
+			config['injections'].put(time())
+			inject(emulator, config['fault'], cell, True)
+			config['commands'].get()
+			inject(emulator, config['fault'], cell, False)
+	Thread(target=injector, daemon=True).start()
+	run_chain(chain, config, telemetry, profiler, transport=emulator)
+
+def measure_supervisor(boards, fault, trials, latency, cycle_s, delivery):
+	"""Returns the reactions of the Supervisor path to one fault (in a dict)."""
+	config = {
+		'boards': boards,
+		'latency': latency,
+		'fault': fault,
+		'commands': Queue(),
+		'injections': Queue(),
+	}
+	supervisor = Supervisor([config], worker=run_faulty_chain)
+
+	stops = []
+	stop = supervisor.sunny_boy.stop
+	def recorded_stop():
+		if supervisor.sunny_boy.get_state():
+			stops.append(time())
+		stop()
+	supervisor.sunny_boy.stop = recorded_stop
+
+	def step_until(condition, timeout):
+		end = time() + timeout
+		while not condition():
+			if time() > end:
+				return False
+			supervisor.step(wait=0.001)
+		return True
+
+	reactions = []
+	try:
+		for i in range(trials):
+			step_until(lambda: supervisor.running, 60)
+			end = time() + random.uniform(0, cycle_s) # Random point of the cycle
+			step_until(lambda: time() > end, 60)
+			del stops[:]
+			config['commands'].put(random.randrange(BMS._BLOCKS_PER_BOARD))
+			step_until(lambda: len(stops) > 0, 60)
+			injected = config['injections'].get(timeout=60)
+			reactions.append(stops[0] - injected if stops else None)
+			config['commands'].put(None) # Clear the fault
+	finally:
+		supervisor.shutdown()
+
+	measured = [r for r in reactions if r is not None]
+	bound = BOUND_CYCLES[fault] * cycle_s + delivery
+	return {
+		'path': 'supervisor',
+		'fault': fault,
+		'boards': boards,
+		'latency': latency,
+		'trials': trials,
+		'bound_s': bound,
+		'max_s': max(measured, default=None),
+		'mean_s': sum(measured) / len(measured) if measured else None,
+		'passed': len(measured) == trials and all(r <= bound for r in measured),
+	}
+
+def main():
+	parser = argparse.ArgumentParser(description="Reaction time of the safety fast path")
+	parser.add_argument('--faults', nargs='+', choices=sorted(BOUND_CYCLES), default=['ov', 'uv', 'oh', 'ambient'])
+	parser.add_argument('--boards', type=int, default=1)
+	parser.add_argument('--trials', type=int, default=20)
+	parser.add_argument('--latency', type=float, default=0.001, help="seconds per emulated transaction")
+	parser.add_argument('--delivery', type=float, default=0.1, help="bound in seconds of the trip message to the Supervisor")
+	parser.add_argument('--seed', type=int, default=0)
+	args = parser.parse_args()
+
+	random.seed(args.seed)
+	passed = True
+	for fault in args.faults:
+		result = measure(args.boards, fault, args.trials, args.latency)
+		print(json.dumps(result))
+		supervised = measure_supervisor(args.boards, fault, args.trials, args.latency, result['cycle_s'], args.delivery)
+		print(json.dumps(supervised))
+		passed = passed and result['passed'] and supervised['passed']
+	sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+	main()
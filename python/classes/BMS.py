@@ -153,14 +153,24 @@ class BMS():
 	_PT1000 = 1000
 	_SERIES_R = 1000.00 	# Adjusted Value (Nominal: 1 kOhm)
 
-	def __init__(self, boards, period=100):
-		self.isoSPI = isoSPI()
+	# Limits ------------------------------------
+	_OV = 4.2				# Overvoltage (V)
+	_UV = 2.8				# Undervoltage (V)
+	_AMBIENT_MIN = 0		# Minimum Ambient Temperature (°C)
+	_AMBIENT_MAX = 45		# Maximum Ambient Temperature (°C)
+
+	def __init__(self, boards, period=100, transport=None, on_trip=None):
+		if transport is None:
+			transport = isoSPI()
+		self.isoSPI = transport
+		self.on_trip = on_trip # Called by trip right after pausing the balancing (e.g. to notify the Supervisor)
 		self.sunny_boy = SunnyBoy(period)
 		self.boards = boards
 		self.blocks = self.boards * BMS._BLOCKS_PER_BOARD
 		
 		self.balance_cmd = 0
 		self.balancing = False
+		self.tripped = False # A limit was violated during the current pass (see trip)
 		self.running = False
 		self.current = 0
 		
@@ -193,14 +203,14 @@ class BMS():
 		(Communication to the battery inverter is not actually implemented!)
 		"""
 		self.sunny_boy.start()
-		self.running = self.get_state()
+		self.get_state()
 
 	def stop(self):
 		"""Tells the battery inverter (Sunny Boy Storage 2.5) to stop operation.
 		(Communication to the battery inverter is not actually implemented!)
 		"""
 		self.sunny_boy.stop()
-		self.running = self.get_state()
+		self.get_state()
 
 	def polling(self):
 		"""Waits until the conversion is complete."""
@@ -266,6 +276,82 @@ class BMS():
 		balance_cmd = BMS._ADDR | BMS._EBC
 		self.spi(1, self.boards, balance_cmd)
 
+	def renew_balancing(self):
+		"""Renews the balancing if it is active."""
+		if self.balancing:
+			self.start_balancing()
+
+	def monitor(self):
+		"""Performs one monitoring pass (ambient temperature, cell temperatures and voltages).
+		The voltages are measured every pass, so that overvoltage and undervoltage trip within two passes.
+		The pass ends as soon as a limit is violated (see trip).
+		"""
+		self.tripped = False
+		self.renew_balancing()
+		self.measure_ambient_temp()
+		if self.tripped:
+			return
+		self.renew_balancing()
+		self.temp_mon()
+		if self.tripped:
+			return
+		self.renew_balancing()
+		self.measure_voltages()
+		if self.tripped:
+			return
+		self.renew_balancing()
+
+	def trip(self):
+		"""Safety fast path: pauses the balancing and stops the battery inverter as soon as a limit is violated.
+		If the balancing or the battery inverter was still running, on_trip is called and the rest of the pass
+		is skipped (see monitor).
+		"""
+		if self.balancing or self.running:
+			self.tripped = True
+			if self.on_trip is not None:
+				self.on_trip()
+		self.pause_balancing()
+		self.balancing = False
+		self.stop()
+
+	def balancing_permitted(self):
+		"""Returns True if the ambient temperature, the cell temperatures and the voltages are OK."""
+		return self.ambient_temp_ok and self.cells_not_oh and self.cells_not_ov and self.cells_not_uv
+
+	def balance(self):
+		"""Starts or pauses the balancing depending on the last monitoring pass."""
+		if self.balancing_permitted():
+			self.det_balancing_cmd()
+			self.write_balance_cmd(self.balance_cmd)
+			self.start_balancing()
+			self.balancing = True
+		else:
+			self.pause_balancing()
+			self.balancing = False
+
+	def control_inverter(self):
+		"""Starts or stops the battery inverter (Sunny Boy Storage 2.5) depending on the balancing."""
+		self.get_state()
+		if self.balancing:
+			if not self.running:
+				self.start()
+		elif self.running:
+			self.stop()
+
+	def status(self):
+		"""Returns the results of the last monitoring pass (in a dict)."""
+		return {
+			'balancing': self.balancing,
+			'ambient_temp_ok': self.ambient_temp_ok,
+			'ambient_temp': self.ambient_temp,
+			'cells_not_oh': self.cells_not_oh,
+			'temp_ok': list(self.temp_ok),
+			'voltages': list(self.voltages),
+			'cells_not_ov': self.cells_not_ov,
+			'cells_not_uv': self.cells_not_uv,
+			'balance_cmd': self.balance_cmd,
+		}
+
 	def det_balancing_cmd(self):
 		"""Determines the necessary balancing command."""
 		average = 0
@@ -327,13 +413,26 @@ class BMS():
 		self.polling() # Wait until measurements are finished
 		if self.balancing:
 			self.start_balancing() # Resume balancing
-		cvar_p = self.rx(BMS._RDCVA)[0] # Primary Board
-		cvbr_p = self.rx(BMS._RDCVB)[0] # Primary Board
-		voltages = self.calc_voltages_from_reg(cvar_p)
-		voltages.extend(self.calc_voltages_from_reg(cvbr_p))
+		voltages = []
+		for cmd in [BMS._RDCVA, BMS._RDCVB]:
+			cvr_p = self.rx(cmd)[0] # Primary Board
+			group = self.calc_voltages_from_reg(cvr_p)
+			voltages.extend(group)
+			if not self.voltages_ok(group):
+				self.trip()
+				if self.tripped:
+					voltages.extend(self.voltages[len(voltages):BMS._BLOCKS_PER_BOARD]) # Keep the previous voltages
+					break
 		self.voltages = voltages
 		self.check_voltages()
 
+	def voltages_ok(self, voltages):
+		"""Returns True if none of the voltages is overvoltage or undervoltage."""
+		for voltage in voltages:
+			if voltage > BMS._OV or voltage < BMS._UV:
+				return False
+		return True
+
 	def check_voltages(self):
 		"""Checks the voltages for overvoltage and undervoltage."""
 		cell_not_ov = []
@@ -341,10 +440,10 @@ class BMS():
 		cells_not_ov = True
 		cells_not_uv = True
 		for voltage in self.voltages:
-			if voltage > 4.2:
+			if voltage > BMS._OV:
 				cell_not_ov.append(False)
 				cells_not_ov = False
-			elif voltage < 2.8:
+			elif voltage < BMS._UV:
 				cell_not_uv.append(False)
 				cells_not_uv = False
 			else:
@@ -379,7 +478,12 @@ class BMS():
 			logic_level = cfgar_p & (0b1 << (5*8 + 4)) # Active-High Signal
 			if logic_level:
 				temp_ok.append(False)
-				cells_not_oh = False
+				if cells_not_oh:
+					cells_not_oh = False
+					self.trip()
+				if self.tripped:
+					temp_ok.extend(self.temp_ok[len(temp_ok):]) # Remaining blocks are checked in the next pass
+					break
 			else:
 				temp_ok.append(True)
 
@@ -399,10 +503,11 @@ class BMS():
 		else:
 			rt = BMS._SERIES_R / (v_ref2/v_pt1000 - 1)
 			self.ambient_temp = self.temp(BMS._PT1000, rt)
-		if self.ambient_temp >= 0 and self.ambient_temp <= 45:
+		if self.ambient_temp >= BMS._AMBIENT_MIN and self.ambient_temp <= BMS._AMBIENT_MAX:
 			self.ambient_temp_ok = True
 		else:
 			self.ambient_temp_ok = False
+			self.trip()
 
 	def temp(self, r0, rt):
 		"""Calculates the temperature from r0 and rt."""
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+from os import getpid, path
+from threading import Event, Thread, get_ident
+from time import time, sleep
+import marshal
+import signal
+import sys
+
+class Profiler():
+	"""Samples the stacks of the running process for a bounded window when a signal is received.
+	The sampling thread only exists during a window. Processes forked during a window (e.g. push_status)
+	inherit no locks of it besides the ones of its own output file.
+	"""
+
+	_MAX_RATE = 1000		# Samples per second
+	_MAX_DEPTH = 64			# Frames per stack (innermost frames are kept)
+	_FORMATS = ['collapsed', 'pstats']
+
+	def __init__(self, output='/tmp/theBMS', rate=50, duration=30, format_='collapsed'):
+		"""Formal parameters:
+		output -- prefix of the output files (-<pid>-<timestamp>.<format_> is appended)
+		rate -- samples per second
+		duration -- maximum seconds per window
+		format_ -- 'collapsed' (flame graphs) or 'pstats'
+		"""
+		if format_ not in Profiler._FORMATS:
+			raise ValueError("format_ must be one of " + str(Profiler._FORMATS))
+		self.output = output
+		self.interval = 1 / min(max(rate, 1), Profiler._MAX_RATE)
+		self.duration = duration
+		self.format = format_
+		self.stop = None
+		self.thread = None
+
+	def install(self, signum=signal.SIGUSR1):
+		"""Starts or stops a sampling window whenever signum is received (must be called from the main thread)."""
+		self.stop = Event()
+		self.thread = None
+		signal.signal(signum, self.toggle)
+
+	def toggle(self, signum=None, frame=None):
+		"""Starts a sampling window or stops the running one early."""
+		if self.thread is not None and self.thread.is_alive():
+			self.stop.set()
+		else:
+			self.stop.clear()
+			self.thread = Thread(target=self.run, name='Profiler', daemon=True)
+			self.thread.start()
+
+	def run(self):
+		"""Samples one window and writes it."""
+		self.write(self.sample())
+
+	def sample(self):
+		"""Returns the number of samples per stack (in a dict of tuples of frames) of one window."""
+		samples = {}
+		ident = get_ident()
+		end = time() + self.duration
+		while time() < end and not self.stop.is_set():
+			for thread, frame in sys._current_frames().items():
+				if thread == ident:
+					continue
+				stack = []
+				while frame is not None and len(stack) < Profiler._MAX_DEPTH:
+					code = frame.f_code
+					stack.append((code.co_filename, code.co_firstlineno, getattr(code, 'co_qualname', code.co_name)))
+					frame = frame.f_back
+				stack = tuple(reversed(stack))
+				samples[stack] = samples.get(stack, 0) + 1
+			sleep(self.interval)
+		return samples
+
+	def write(self, samples):
+		"""Writes the samples to a new file and returns its name."""
+		filename = "{}-{}-{}.{}".format(self.output, getpid(), int(time()), self.format)
+		if self.format == 'pstats':
+			with open(filename, 'wb') as f:
+				marshal.dump(self.calc_pstats(samples), f)
+		else:
+			with open(filename, 'w') as f:
+				for stack, count in sorted(samples.items()):
+					f.write(';'.join(self.label(frame) for frame in stack) + ' ' + str(count) + '\n')
+		return filename
+
+	def label(self, frame):
+		"""Returns the name of a frame in a collapsed stack (e.g. BMS.py:BMS.temp_mon)."""
+		return path.basename(frame[0]) + ':' + frame[2]
+
+	def calc_pstats(self, samples):
+		"""Converts the samples to the format of pstats.Stats (call counts are sample counts)."""
+		stats = {}
+		for stack, count in samples.items():
+			t = count * self.interval
+			for i, frame in enumerate(stack):
+				if frame in stack[:i]: # Recursion: count once
+					continue
+				cc, nc, tt, ct, callers = stats.get(frame, (0, 0, 0.0, 0.0, {}))
+				if i == len(stack) - 1:
+					tt += t
+				if i > 0:
+					caller = callers.get(stack[i-1], (0, 0, 0.0, 0.0))
+					callers[stack[i-1]] = (caller[0] + count, caller[1] + count, caller[2], caller[3] + t)
+				stats[frame] = (cc + count, nc + count, tt, ct + t, callers)
+		return stats
+
+def main():
+	pass
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+from classes.BMS import BMS
+from classes.SunnyBoy import SunnyBoy
+from classes.isoSPI import isoSPI
+from classes.isoSPIEmulator import isoSPIEmulator
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait as wait_for
+from time import time
+import os
+import signal
+
+TRIP = 'trip' # Sent instead of a status as soon as a chain trips (see BMS.trip)
+
+def run_chain(chain, config, telemetry, profiler=None, transport=None):
+	"""Monitors one isoSPI chain (worker process) and sends the status of every pass to the Supervisor.
+	A trip is sent immediately, so that the Supervisor stops the battery inverter.
+
+	Formal parameters:
+	chain -- int
+	config -- {'boards': int, 'executable': str, 'emulated': bool, 'latency': float}
+	telemetry -- multiprocessing.connection.Connection (sending end of the chain's own pipe)
+	profiler -- Profiler (installed in the worker process)
+	transport -- isoSPI (optional, overrides config)
+	"""
+	if profiler is not None:
+		profiler.install()
+	if transport is None:
+		if config.get('emulated', False):
+			transport = isoSPIEmulator(config['boards'], latency=config.get('latency', 0.0))
+		else:
+			transport = isoSPI(config.get('executable', isoSPI._EXECUTABLE))
+	on_trip = lambda: telemetry.send((chain, time(), TRIP))
+	bms = BMS(config['boards'], transport=transport, on_trip=on_trip)
+
+	while True:
+		bms.monitor()
+		bms.balance()
+		telemetry.send((chain, time(), bms.status()))
+
+class Supervisor():
+	"""Runs one BMS per isoSPI chain in a worker process and controls the battery inverter for the whole pack."""
+
+	def __init__(self, chains, period=100, timeout=30, restart_delay=5, profiler=None, worker=run_chain):
+		"""Formal parameters:
+		chains -- [config]*number of chains (see run_chain)
+		timeout -- minimum seconds without telemetry until a chain is considered hung
+			(until the second status of a chain: timeout per board, afterwards: at least 3 times its longest pass)
+		restart_delay -- seconds until a failed chain is restarted
+		profiler -- Profiler installed in every worker process (optional, SIGUSR1 is forwarded to the workers)
+		worker -- function run by the worker processes (see run_chain)
+		"""
+		self.chains = chains
+		self.sunny_boy = SunnyBoy(period)
+		self.timeout = timeout
+		self.restart_delay = restart_delay
+		self.profiler = profiler
+		self.worker = worker
+
+		self.running = False
+		self.workers = [None] * len(chains)
+		self.telemetry = [None] * len(chains)		# Receiving end of the pipe of each chain
+		self.states = [None] * len(chains)		# Last status of each chain (None means faulted)
+		self.last_seen = [0] * len(chains)
+		self.pass_time = [None] * len(chains)		# Longest time between two statuses of each chain
+		self.next_start = [0] * len(chains)
+		self.restarts = [0] * len(chains)
+
+	def start_chain(self, chain):
+		"""Starts the worker process of a chain with its own pipe (a failing worker can only break its own pipe)."""
+		receiver, sender = Pipe(duplex=False)
+		p = Process(target=self.worker, args=[chain, self.chains[chain], sender, self.profiler], daemon=True)
+		p.start()
+		sender.close() # Only the worker writes (EOF when it exits)
+		self.workers[chain] = p
+		self.telemetry[chain] = receiver
+		self.states[chain] = None
+		self.last_seen[chain] = time()
+		self.pass_time[chain] = None
+
+	def fail_chain(self, chain):
+		"""Terminates the worker process of a chain and schedules its restart."""
+		p = self.workers[chain]
+		if p.is_alive():
+			p.terminate()
+		p.join()
+		self.telemetry[chain].close()
+		self.workers[chain] = None
+		self.telemetry[chain] = None
+		self.states[chain] = None
+		self.next_start[chain] = time() + self.restart_delay
+		self.restarts[chain] += 1
+
+	def chain_timeout(self, chain):
+		"""Returns the seconds without telemetry until a chain is considered hung."""
+		if self.pass_time[chain] is None:
+			return self.timeout * self.chains[chain]['boards']
+		return max(self.timeout, 3 * self.pass_time[chain])
+
+	def check_chains(self):
+		"""Restarts chains which failed or stopped sending telemetry. The other chains keep running."""
+		now = time()
+		for chain, p in enumerate(self.workers):
+			if p is None:
+				if now >= self.next_start[chain]:
+					self.start_chain(chain)
+			elif not p.is_alive() or now - self.last_seen[chain] > self.chain_timeout(chain):
+				self.fail_chain(chain)
+
+	def receive(self, wait=1):
+		"""Returns the telemetry received within wait seconds (in a list of (chain, timestamp, status)).
+		The battery inverter is stopped as soon as a trip is received (trips are not returned).
+		"""
+		receivers = [r for r in self.telemetry if r is not None]
+		messages = []
+		for receiver in wait_for(receivers, timeout=wait):
+			chain = self.telemetry.index(receiver)
+			try:
+				while receiver.poll():
+					messages.append(receiver.recv())
+			except (EOFError, OSError):
+				self.fail_chain(chain) # Worker exited (its pipe is broken)
+
+		statuses = []
+		for chain, timestamp, status in messages:
+			if self.workers[chain] is None:
+				continue
+			if status == TRIP:
+				self.trip(chain)
+			else:
+				if self.states[chain] is not None:
+					self.pass_time[chain] = max(self.pass_time[chain] or 0, timestamp - self.last_seen[chain])
+				self.states[chain] = status
+				statuses.append((chain, timestamp, status))
+			self.last_seen[chain] = timestamp
+		return statuses
+
+	def trip(self, chain):
+		"""Stops the battery inverter immediately because a chain tripped."""
+		self.states[chain] = None # Until the next status of the chain
+		self.sunny_boy.stop()
+		self.running = False
+
+	def balancing_permitted(self):
+		"""Returns True if every chain is running and permits balancing."""
+		for status in self.states:
+			if status is None or not status['balancing']:
+				return False
+		return True
+
+	def control_inverter(self):
+		"""Starts or stops the battery inverter (Sunny Boy Storage 2.5) depending on the whole pack."""
+		self.running = self.sunny_boy.get_state()
+		if self.balancing_permitted():
+			if not self.running:
+				self.sunny_boy.start()
+		elif self.running:
+			self.sunny_boy.stop()
+		self.running = self.sunny_boy.get_state()
+
+	def step(self, wait=1):
+		"""Supervises the chains once and returns the received telemetry."""
+		self.check_chains()
+		messages = self.receive(wait)
+		self.control_inverter()
+		return messages
+
+	def forward_signal(self, signum, frame=None):
+		"""Forwards a signal to every worker process."""
+		for p in self.workers:
+			if p is not None and p.pid is not None:
+				try:
+					os.kill(p.pid, signum)
+				except ProcessLookupError:
+					pass # Restarted by check_chains
+
+	def run(self, callback=None):
+		"""Supervises the chains forever. callback(chain, status) is called for every received status."""
+		if self.profiler is not None:
+			signal.signal(signal.SIGUSR1, self.forward_signal)
+		try:
+			while True:
+				for chain, timestamp, status in self.step():
+					if callback is not None:
+						callback(chain, status)
+		finally:
+			self.shutdown()
+
+	def shutdown(self):
+		"""Stops the battery inverter and all worker processes."""
+		self.sunny_boy.stop()
+		self.running = False
+		for chain, p in enumerate(self.workers):
+			if p is not None:
+				p.terminate()
+				p.join()
+				self.telemetry[chain].close()
+				self.workers[chain] = None
+				self.telemetry[chain] = None
+
+def main():
+	pass
+
+if __name__ == "__main__":
+	main()
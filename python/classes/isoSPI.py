@@ -32,13 +32,17 @@ class isoSPI:
 	_CE0 = 24
 	_CE1 = 26
 
-	def __init__(self):
+	# C++ Program -------------------------------
+	_EXECUTABLE = '/home/pi/cc/isoSPI'
+
+	def __init__(self, executable=_EXECUTABLE):
+		self.executable = executable
 		self.line = 0
-		pass
+		self.bus_bytes = 0
 
 	def xfer(self, spi, boards, cmd, data=[], error_check=True):
 		"""Returns the result or None in case of a connection error."""
-		tx = ['/home/pi/cc/isoSPI', str(self.line), str(spi), str(boards), str(cmd)]
+		tx = [self.executable, str(self.line), str(spi), str(boards), str(cmd)]
 		for d in data:
 			tx.append(str(d))
 
@@ -53,6 +57,7 @@ class isoSPI:
 				tx[1] = str(self.line)
 			count += 1
 
+			self.count_bus_bytes(spi, boards, data)
 			res = subprocess.run(tx, stdout=subprocess.PIPE)
 			stdout = res.stdout.decode('utf-8')
 			length = int(len(stdout) / 16)
@@ -64,6 +69,12 @@ class isoSPI:
 				rx.append(msg)
 		return rx
 
+	def count_bus_bytes(self, spi, boards, data):
+		"""Counts the bytes transferred on the SPI bus by one call of the C++ program."""
+		self.bus_bytes += boards + 4 + len(data)*8 # Wakeup, CMD and DATA bytes
+		if spi:
+			self.bus_bytes += 4 + spi*3 + 4 + boards*8 # SPI execute and readback
+
 	def rx(self, boards, cmd):
 		"""Returns the valid content of a register (in a list) or None."""
 		pec = self.calc_CRC15(cmd, isoSPI._CMD_BYTES)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+from classes.BMS import BMS
+from classes.isoSPI import isoSPI
+from time import sleep
+
+class isoSPIEmulator(isoSPI):
+	"""Emulates a chain of BMS-Boards (LTC6813-1 and LTC3300-1) instead of calling the C++ program."""
+
+	# LTC6813-1 (commands and PT1000 - ITS-90 coefficients: see BMS) ---
+	_RDCV = [BMS._RDCVA, BMS._RDCVB, BMS._RDCVC, BMS._RDCVD, BMS._RDCVE, BMS._RDCVF]
+	_RDAUX = [BMS._RDAUXA, BMS._RDAUXB, BMS._RDAUXC, BMS._RDAUXD]
+
+	# Conversions (command with MD, DCP, CH / CHG bits masked)
+	_ADCV_MASK = 0x0668
+	_ADAX_MASK = 0x0678
+
+	_CELLS = 18				# Cells per LTC6813-1
+	_GPIOS = 12				# GPIO 1–5, 2nd Reference, GPIO 6–9 (and two unused)
+	_LSB = 100e-6			# Voltage per ADC code
+	_REF2 = 3.0				# 2nd Reference
+
+	def __init__(self, boards, latency=0.0):
+		isoSPI.__init__(self, executable=None)
+		self.boards = boards
+		self.latency = latency				# Seconds per transaction (C++ program)
+
+		# Emulated quantities (may be changed at any time)
+		self.voltages = [[3.7] * isoSPIEmulator._CELLS for b in range(boards)]
+		self.overheated = [set() for b in range(boards)]	# Overheated blocks (multiplexer channels)
+		self.ambient_temp = [25.0] * boards
+
+		# Registers
+		self.cfga = [0] * boards
+		self.cfgb = [0] * boards
+		self.cv = [[0] * isoSPIEmulator._CELLS for b in range(boards)]
+		self.aux = [[0] * isoSPIEmulator._GPIOS for b in range(boards)]
+
+		# LTC3300-1
+		self.balance_data = [0] * boards
+		self.balancing = [False] * boards
+
+		self.transactions = 0
+
+	def xfer(self, spi, boards, cmd, data=[], error_check=True):
+		"""Returns the result like the C++ program would."""
+		self.transactions += 1
+		self.count_bus_bytes(spi, boards, data)
+		if self.latency:
+			sleep(self.latency)
+
+		if cmd <= 0xffff: # Sent without PEC (polling)
+			code = cmd
+		else:
+			code = cmd >> isoSPI._PEC_BYTES*8
+
+		if code == BMS._PLADC:
+			return [0xffffffffffffffff] * len(data) # Conversion completed
+		if spi:
+			for b, dat in enumerate(data[:boards]):
+				self.exec_balance(b, dat >> isoSPI._PEC_BYTES*8, spi)
+			return [0x0] * boards
+		if code & isoSPIEmulator._ADCV_MASK == BMS._ADCV:
+			self.convert_voltages()
+		elif code & isoSPIEmulator._ADAX_MASK == BMS._ADAX:
+			self.convert_gpios()
+		elif code == BMS._WRCFGA:
+			for b, dat in enumerate(data[:boards]):
+				self.cfga[b] = dat >> isoSPI._PEC_BYTES*8
+		elif code == BMS._WRCFGB:
+			for b, dat in enumerate(data[:boards]):
+				self.cfgb[b] = dat >> isoSPI._PEC_BYTES*8
+		elif code == BMS._RDCFGA:
+			return [self.with_pec(self.read_cfga(b)) for b in range(boards)]
+		elif code == BMS._RDCFGB:
+			return [self.with_pec(self.cfgb[b]) for b in range(boards)]
+		elif code in isoSPIEmulator._RDCV:
+			group = isoSPIEmulator._RDCV.index(code)
+			return [self.with_pec(self.calc_reg_from_codes(self.cv[b][group*3:group*3 + 3])) for b in range(boards)]
+		elif code in isoSPIEmulator._RDAUX:
+			group = isoSPIEmulator._RDAUX.index(code)
+			return [self.with_pec(self.calc_reg_from_codes(self.aux[b][group*3:group*3 + 3])) for b in range(boards)]
+		return [0x0] * len(data)
+
+	def with_pec(self, reg):
+		"""Appends the 16-bit CRC to the contents of a register."""
+		return (reg << isoSPI._PEC_BYTES*8) | self.calc_CRC15(reg, isoSPI._DATA_BYTES)
+
+	def calc_reg_from_codes(self, codes):
+		"""Calculates the contents of a register from three ADC codes (inverse of BMS.calc_voltages_from_reg)."""
+		reg = 0
+		for i, code in enumerate(codes):
+			reg |= (code & 0xff) << (5 - i*2) * 8
+			reg |= (code >> 8) << (4 - i*2) * 8
+		return reg
+
+	def calc_code(self, voltage):
+		"""Calculates the ADC code of a voltage."""
+		return min(max(int(round(voltage / isoSPIEmulator._LSB)), 0), 0xffff)
+
+	def convert_voltages(self):
+		"""Latches the emulated cell voltages into the cell voltage registers."""
+		for b in range(self.boards):
+			self.cv[b] = [self.calc_code(v) for v in self.voltages[b]]
+
+	def convert_gpios(self):
+		"""Latches the emulated PT1000 voltage (GPIO1) and the 2nd reference into the auxiliary registers."""
+		for b in range(self.boards):
+			t = self.ambient_temp[b]
+			rt = BMS._PT1000 * (1 + BMS._POLY_A*t + BMS._POLY_B*t**2)
+			self.aux[b][0] = self.calc_code(isoSPIEmulator._REF2 * rt / (rt + BMS._SERIES_R))
+			self.aux[b][5] = self.calc_code(isoSPIEmulator._REF2)
+
+	def read_cfga(self, board):
+		"""Returns the configuration register group A with the overheat signal of the selected block."""
+		block = (self.cfgb[board] >> 5*8) & 0xff
+		cfga = self.cfga[board] & ~(0b1 << (5*8 + 4))
+		if block in self.overheated[board]:
+			cfga |= 0b1 << (5*8 + 4) # Active-High Signal
+		return cfga
+
+	def exec_balance(self, board, comm, spi):
+		"""Executes the balancing command of an SPI transaction on the LTC3300-1."""
+		balance_cmd = (comm >> 36) & 0xff
+		if spi == 3:
+			self.balance_data[board] = ((comm >> 12) & 0xff00 | (comm >> 4) & 0xff) >> isoSPI._BALANCE_PEC_BITS
+		elif self.check_even_parity(balance_cmd, isoSPI._BALANCE_CMD_PEC_BYTES):
+			self.balancing[board] = True # Start Balancing
+		else:
+			self.balancing[board] = False # Pause Balancing
+
+def main():
+	pass
+
+if __name__ == "__main__":
+	main()
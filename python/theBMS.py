@@ -6,13 +6,14 @@ Copyright © 2019 pro3E - Team4
 
 from multiprocessing import Process
 from classes.BMS import BMS
+from classes.Profiler import Profiler
+from classes.Supervisor import Supervisor
+from classes.isoSPI import isoSPI
+from classes.isoSPIEmulator import isoSPIEmulator
 from time import time
+import argparse
 import _mysql
 
-def renew_balancing(bms):
-	if bms.balancing:
-		bms.start_balancing()
-
 def push_to_db(query):
 	host = "hostname"
 	port = 3306
@@ -27,22 +28,33 @@ def push_to_db(query):
 	except:
 		pass
 
-def main():
-	bms = BMS(1, period=100)
-	counter = 2
+def compute_query(status, id_=0):
+	query = "UPDATE bms SET timestamp = '" + str(int(time()))
+	query += "', balancing = '" + str(int(status['balancing']))
+	query += "', temp = '{:.1f}".format(status['ambient_temp'])
+	query += "', v1 = '{:.3f}".format(status['voltages'][0])
+	query += "', v2 = '{:.3f}".format(status['voltages'][1])
+	query += "', v3 = '{:.3f}".format(status['voltages'][2])
+	query += "', v4 = '{:.3f}".format(status['voltages'][3])
+	query += "', v5 = '{:.3f}".format(status['voltages'][4])
+	query += "', v6 = '{:.3f}".format(status['voltages'][5])
+	query += "', m1 = '" + str(int(status['temp_ok'][0]))
+	query += "', m2 = '" + str(int(status['temp_ok'][1]))
+	query += "', m3 = '" + str(int(status['temp_ok'][2]))
+	query += "', m4 = '" + str(int(status['temp_ok'][3]))
+	query += "', m5 = '" + str(int(status['temp_ok'][4]))
+	query += "', m6 = '" + str(int(status['temp_ok'][5]))
+	query += "', balancecmd = '" + str(status['balance_cmd'])
+	query += "' WHERE id = '" + str(id_) + "'"
+	return query
+
+def push_status(chain, status):
+	p = Process(target=push_to_db, args=[compute_query(status, chain)])
+	p.start()
 
+def run(bms):
 	while True:
-		renew_balancing(bms)
-		bms.measure_ambient_temp()
-		renew_balancing(bms)
-		bms.temp_mon()
-		renew_balancing(bms)
-		if counter == 2:
-			bms.measure_voltages()
-			renew_balancing(bms)
-			counter = 0
-		else:
-			counter += 1
+		bms.monitor()
 
 		# Debug -------------------------------------
 		# print("##################################")
@@ -57,43 +69,45 @@ def main():
 		# print("cell_not_uv: " + str(bms.cell_not_uv))
 		# Debug -------------------------------------
 
-		balancing = bms.ambient_temp_ok and bms.cells_not_oh and bms.cells_not_ov and bms.cells_not_uv
-		if balancing:
-			bms.det_balancing_cmd()
-			bms.write_balance_cmd(bms.balance_cmd)
-			bms.start_balancing()
-			bms.balancing = True
-			bms.get_state()
-			if not bms.running:
-				bms.start()
-		else:
-			bms.pause_balancing()
-			bms.balancing = False
-			bms.get_state()
-			if bms.running:
-				bms.stop()
+		bms.balance()
+		bms.control_inverter()
 
-		# Compute Query Command
-		query = "UPDATE bms SET timestamp = '" + str(int(time()))
-		query += "', balancing = '" + str(int(bms.balancing))
-		query += "', temp = '{:.1f}".format(bms.ambient_temp)
-		query += "', v1 = '{:.3f}".format(bms.voltages[0])
-		query += "', v2 = '{:.3f}".format(bms.voltages[1])
-		query += "', v3 = '{:.3f}".format(bms.voltages[2])
-		query += "', v4 = '{:.3f}".format(bms.voltages[3])
-		query += "', v5 = '{:.3f}".format(bms.voltages[4])
-		query += "', v6 = '{:.3f}".format(bms.voltages[5])
-		query += "', m1 = '" + str(int(bms.temp_ok[0]))
-		query += "', m2 = '" + str(int(bms.temp_ok[1]))
-		query += "', m3 = '" + str(int(bms.temp_ok[2]))
-		query += "', m4 = '" + str(int(bms.temp_ok[3]))
-		query += "', m5 = '" + str(int(bms.temp_ok[4]))
-		query += "', m6 = '" + str(int(bms.temp_ok[5]))
-		query += "', balancecmd = '" + str(bms.balance_cmd)
-		query += "' WHERE id = '0'"
+		push_status(0, bms.status())
 
-		p = Process(target=push_to_db, args=[query])
-		p.start()
+def main():
+	parser = argparse.ArgumentParser(description="theBMS ~ Safe, Easy and Affordable")
+	parser.add_argument('--chains', type=int, default=1, help="number of isoSPI chains (one worker process each)")
+	parser.add_argument('--boards', type=int, default=1, help="number of boards per chain")
+	parser.add_argument('--executable', nargs='+', default=[], help="C++ program of each chain")
+	parser.add_argument('--emulate', action='store_true', help="emulate the chains instead of using the C++ program")
+	parser.add_argument('--timeout', type=float, default=30, help="minimum seconds without telemetry until a chain is restarted")
+	parser.add_argument('--profile-rate', type=int, default=50, help="samples per second of the profiler (SIGUSR1)")
+	parser.add_argument('--profile-duration', type=float, default=30, help="maximum seconds per profiler window")
+	parser.add_argument('--profile-output', default='/tmp/theBMS', help="prefix of the profiler output files")
+	parser.add_argument('--profile-format', choices=['collapsed', 'pstats'], default='collapsed')
+	args = parser.parse_args()
+
+	profiler = Profiler(args.profile_output, args.profile_rate, args.profile_duration, args.profile_format)
+
+	if not args.emulate and (args.chains > 1 or args.executable) and len(args.executable) != args.chains:
+		parser.error("every chain needs its own C++ program (one --executable per chain)")
+
+	if args.chains == 1:
+		profiler.install()
+		if args.emulate:
+			run(BMS(args.boards, period=100, transport=isoSPIEmulator(args.boards)))
+		elif args.executable:
+			run(BMS(args.boards, period=100, transport=isoSPI(args.executable[0])))
+		else:
+			run(BMS(args.boards, period=100))
+	else:
+		chains = []
+		for chain in range(args.chains):
+			config = {'boards': args.boards, 'emulated': args.emulate}
+			if not args.emulate:
+				config['executable'] = args.executable[chain]
+			chains.append(config)
+		Supervisor(chains, period=100, timeout=args.timeout, profiler=profiler).run(push_status)
 
 if __name__ == "__main__":
 	main()